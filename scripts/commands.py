@@ -5,6 +5,8 @@ import re
 
 
 class Command():
+    __slots__ = ('alias', 'ID', 'has_request', 'has_reply', 'request_fields', 'reply_fields', 'alias_upper', 'id_hex4', 'id_hex4_lower')
+
     def __init__(self, data):
         """
         Command instance
@@ -13,6 +15,10 @@ class Command():
         self.has_request = YAML_REQUEST_CONTENT_KEY in data
         self.has_reply = YAML_REPLY_CONTENT_KEY in data
         self.ID = data[YAML_ID_KEY]
+        # Derived strings used by the code generators
+        self.alias_upper = self.alias.upper()
+        self.id_hex4 = f"0x{self.ID:04X}"
+        self.id_hex4_lower = f"0x{self.ID:04x}"
 
         if self.has_request:
             fields_description = data[YAML_REQUEST_CONTENT_KEY]
@@ -72,6 +78,9 @@ class Field():
             # It is an enum
             self.enum = list(enumerate(type))
             self.type = types.enum
+        elif type in ALLOWED_TYPES:
+            # Exact type name, no need to try each pattern
+            self.type = ALLOWED_TYPES[type]
         else:
             for pattern_string, type_class in ALLOWED_TYPES.items():
                 if re.match(pattern_string, type):
@@ -4,26 +4,91 @@ C++ code generation class
 
 from commands import Command
 from os.path import join, dirname
-from utilities import replace_str
+from utilities import replace_str, load_template
 from settings import types, SIZE
 from typing import List
 
 
 TAB = 4*' '
+# Indentation levels
+IND1, IND2, IND3, IND4 = TAB, 2*TAB, 3*TAB, 4*TAB
 
+# Declaration templates for each type
 CPP_DECLARATION_TYPE_CONVERSION = {
-    types.short: lambda field: f"int16_t {field.name};\n",
-    types.ushort: lambda field: f"uint16_t {field.name};\n",
-    types.int: lambda field: f"int32_t {field.name};\n",
-    types.uint: lambda field: f"uint32_t {field.name};\n",
-    types.longlong: lambda field: f"int64_t {field.name};\n",
-    types.ulonglong: lambda field: f"uint64_t {field.name};\n",
-    types.float: lambda field: f"float {field.name};\n",
-    types.double: lambda field: f"double {field.name};\n",
-    types.char: lambda field: f"char {field.name}[{field.size}];\n",
-    types.byte: lambda field: f"byte {field.name}[{field.size}];\n",
-    # enum : Merge a list [(0, 'A'), (1, 'B')] -> {A=0, B=1} etc...
-    types.enum: lambda field: f"enum {field.name}_t {{{', '.join([f'{d[1]}={d[0]}' for d in field.enum])}}} {field.name};\n"
+    types.short: "int16_t {name};\n",
+    types.ushort: "uint16_t {name};\n",
+    types.int: "int32_t {name};\n",
+    types.uint: "uint32_t {name};\n",
+    types.longlong: "int64_t {name};\n",
+    types.ulonglong: "uint64_t {name};\n",
+    types.float: "float {name};\n",
+    types.double: "double {name};\n",
+    types.char: "char {name}[{size}];\n",
+    types.byte: "byte {name}[{size}];\n",
+    types.enum: "enum {name}_t {{{body}}} {name};\n"
+}
+
+def cpp_declaration(field):
+    """
+    Return the C++ declaration of a field
+
+    Returns
+    -------
+    declaration : str
+    """
+    declaration = CPP_DECLARATION_TYPE_CONVERSION[field.type]
+    values = {"name": field.name, "size": getattr(field, 'size', None)}
+    if field.type == types.enum:
+        # enum : Merge a list [(0, 'A'), (1, 'B')] -> {A=0, B=1} etc...
+        values["body"] = ', '.join(f'{d[1]}={d[0]}' for d in field.enum)
+    return declaration.format(**values)
+
+
+def _numeric_field(field):
+    """
+    Copy with endian conversion
+
+    Returns
+    -------
+    parse : str
+    build : str
+    variable : str
+    length : str
+    """
+    return (IND2 + f"pos += ntoh(payloadBuffer->data() + pos, reinterpret_cast<char*>(&{field.name}), {SIZE[field.type]});\n",
+        IND2 + f"pos += hton(reinterpret_cast<char*>(&{field.name}), payloadBuffer->data() + pos, {SIZE[field.type]});\n",
+        IND1 + cpp_declaration(field),
+        str(SIZE[field.type]))
+
+def _array_field(field):
+    """
+    Array
+
+    Returns
+    -------
+    parse : str
+    build : str
+    variable : str
+    length : str
+    """
+    if field.fixed_size:
+        variable = IND1 + cpp_declaration(field)
+        parse = IND2 + f"{field.name} = payloadBuffer->data() + pos;"
+    else:
+        variable = IND1 + f'Buffer {field.name};\n'
+        parse = IND2 + f"{field.name}.fromParent(payloadBuffer, pos, {field.size});"
+    parse += IND2 + f"pos += {field.size};"
+    return parse, '', variable, str(field.size)
+
+# Types copied with endian conversion
+NUMERIC_TYPES = frozenset({types.double, types.int, types.uint, types.float, types.enum})
+# Types stored as byte arrays
+ARRAY_TYPES = frozenset({types.char, types.byte})
+
+# Payload code generation function for each supported field type
+CPP_FIELD_HANDLERS = {
+    **dict.fromkeys(NUMERIC_TYPES, _numeric_field),
+    **dict.fromkeys(ARRAY_TYPES, _array_field)
 }
 
 
@@ -39,86 +104,46 @@ class CPP():
         Return an enum of commands
         """
 
-        output = ''
-        for i, command in enumerate(self._commands):
-            if i > 0:
-                output += ',\n'
-            output += f"{TAB}{command.alias} = 0x{command.ID:04x}"
-
-        return output
+        return ',\n'.join(f"{IND1}{command.alias} = {command.id_hex4_lower}" for command in self._commands)
 
     def payloads(self, payload_template):
         """
         Generate the class description for each payload
         """
 
-        with open(payload_template) as f:
-            CPP_PAYLOAD_TEMPLATE = f.read()
+        CPP_PAYLOAD_TEMPLATE = load_template(payload_template)
 
-        output = ''
+        output = []
 
         for command in self._commands:
             for fields, is_request in filter(lambda x: x[0] is not None, [(command.request_fields, True), (command.reply_fields, False)]):
-                parse = ''
-                build = ''
-                variables = ''
-                argument_constructor = ''
-                arguments = ''
-                length = ''
-
-                for i, field in enumerate(fields):
-                    if i > 0:
-                        arguments += ', '
-                        argument_constructor += ', '
-                        length += ' + '
-
-                    if field.type in [types.double, types.int, types.uint, types.float, types.enum]:
-                        # Copy with endian conversion
-                        parse += 2*TAB + \
-                            f"pos += ntoh(payloadBuffer->data() + pos, reinterpret_cast<char*>(&{field.name}), {SIZE[field.type]});\n"
-                        build += 2*TAB + \
-                            f"pos += hton(reinterpret_cast<char*>(&{field.name}), payloadBuffer->data() + pos, {SIZE[field.type]});\n"
-                        variables += TAB + \
-                            CPP_DECLARATION_TYPE_CONVERSION[field.type](field)
-                        arguments += CPP_DECLARATION_TYPE_CONVERSION[field.type](
-                            field).replace(';', '')
-
-                    elif field.type in [types.char, types.byte]:
-                        # Array
-                        if field.fixed_size:
-                            variables += TAB + \
-                                CPP_DECLARATION_TYPE_CONVERSION[field.type](field)
-                            parse += 2*TAB + \
-                                f"{field.name} = payloadBuffer->data() + pos;"
-                        else:
-                            variables += TAB + f'Buffer {field.name};\n'
-                            parse += 2*TAB + \
-                                f"{field.name}.fromParent(payloadBuffer, pos, {field.size});"
-                        parse += 2*TAB + f"pos += {field.size};"
-                    else:
-                        raise ValueError(f"Unsupported type : {field.type}")
-
-                    if field.type in SIZE.keys():
-                        length += str(SIZE[field.type])
-                    else:
-                        length += str(field.size)
-
-                if not length:
-                    length = '0'
-                length += ';'
-
-                output += replace_str(CPP_PAYLOAD_TEMPLATE, {
+                parse = []
+                build = []
+                variables = []
+                length = []
+
+                for field in fields:
+                    try:
+                        handler = CPP_FIELD_HANDLERS[field.type]
+                    except KeyError:
+                        raise ValueError(f"Unsupported type : {field.type.name}") from None
+                    field_parse, field_build, field_variable, field_length = handler(field)
+                    parse.append(field_parse)
+                    build.append(field_build)
+                    variables.append(field_variable)
+                    length.append(field_length)
+
+                output.append(replace_str(CPP_PAYLOAD_TEMPLATE, {
                     "alias": f"{command.alias}_{'request' if is_request else 'reply'}",
-                    "values": variables,
-                    "parse_function": parse,
-                    "length_function": 2*TAB + 'return ' + length,
-                    "build_function": build,
-                    # "constructor" : TAB + f"{self.name}({arguments}) : {argument_constructor}{{}}"
+                    "values": ''.join(variables),
+                    "parse_function": ''.join(parse),
+                    "length_function": IND2 + 'return ' + (' + '.join(length) or '0') + ';',
+                    "build_function": ''.join(build),
+                    # "constructor" : IND1 + f"{self.name}({arguments}) : {argument_constructor}{{}}"
                     "constructor": '',
-                    "command": TAB+f"cmd_t getCommand() {{return 0x{command.ID:04X};}}",
-                })
-                #argument_constructor += f"{field.name}({field.name})"
-        return output
+                    "command": IND1 + f"cmd_t getCommand() {{return {command.id_hex4};}}",
+                }))
+        return ''.join(output)
 
     def defines(self, request):
         """
@@ -138,15 +163,14 @@ class CPP():
         output : str
         """
 
-        output = ''
+        output = []
 
-        i = 0
         for command in self._commands:
             if command.has_request and request:
-                output += f'#define USE_{command.alias.upper()}_REQUEST_CALLBACK\n'
+                output.append(f'#define USE_{command.alias_upper}_REQUEST_CALLBACK\n')
             elif command.has_reply and (not request):
-                output += f'#define USE_{command.alias.upper()}_REPLY_CALLBACK\n'
-        return output
+                output.append(f'#define USE_{command.alias_upper}_REPLY_CALLBACK\n')
+        return ''.join(output)
 
     def switch(self, request):
         """
@@ -163,36 +187,32 @@ class CPP():
         -------
         output : str
         """
-        TAB = 4
-        output = ''
+        output = []
 
         for command in self._commands:
+            alias = command.alias
             if request and command.has_request:
-                output += f'#if defined(USE_{command.alias.upper()}_REQUEST_CALLBACK) && defined(SYNDESI_DEVICE_MODE)\n'
-                output += ' '*2*TAB + f'case commands::{command.alias}:\n'
-                output += ' '*3*TAB + \
-                    f'request = new {command.alias}_request(requestPayloadBuffer);\n'
-                output += ' '*3*TAB + f'reply = new {command.alias}_reply();\n'
-                output += ' '*3*TAB + \
-                    f'if (_callbacks->{command.alias}_request_callback != nullptr) {{\n'
-                output += ' '*4*TAB + \
-                    f'_callbacks->{command.alias}_request_callback(*(static_cast<{command.alias}_request*>(request)), static_cast<{command.alias}_reply*>(reply));\n'
-                output += ' '*3*TAB + f'}}\n'
-                output += ' '*3*TAB + f'break;\n'
-                output += '#endif\n'
+                output.append(f"""#if defined(USE_{command.alias_upper}_REQUEST_CALLBACK) && defined(SYNDESI_DEVICE_MODE)
+{IND2}case commands::{alias}:
+{IND3}request = new {alias}_request(requestPayloadBuffer);
+{IND3}reply = new {alias}_reply();
+{IND3}if (_callbacks->{alias}_request_callback != nullptr) {{
+{IND4}_callbacks->{alias}_request_callback(*(static_cast<{alias}_request*>(request)), static_cast<{alias}_reply*>(reply));
+{IND3}}}
+{IND3}break;
+#endif
+""")
             elif not request and command.has_reply:
-                output += f'#if defined(USE_{command.alias.upper()}_REPLY_CALLBACK) && defined(SYNDESI_HOST_MODE)\n'
-                output += ' '*2*TAB + f'case commands::{command.alias}:\n'
-                output += ' '*3*TAB + \
-                    f'reply = new {command.alias}_reply(replyPayloadBuffer);\n'
-                output += ' '*3*TAB + \
-                    f'if (_callbacks->{command.alias}_reply_callback != nullptr) {{\n'
-                output += ' '*4*TAB + \
-                    f'_callbacks->{command.alias}_reply_callback(*(static_cast<{command.alias}_reply*>(reply)));\n'
-                output += ' '*3*TAB + f'}}\n'
-                output += ' '*3*TAB + f'break;\n'
-                output += '#endif\n'
-        return output
+                output.append(f"""#if defined(USE_{command.alias_upper}_REPLY_CALLBACK) && defined(SYNDESI_HOST_MODE)
+{IND2}case commands::{alias}:
+{IND3}reply = new {alias}_reply(replyPayloadBuffer);
+{IND3}if (_callbacks->{alias}_reply_callback != nullptr) {{
+{IND4}_callbacks->{alias}_reply_callback(*(static_cast<{alias}_reply*>(reply)));
+{IND3}}}
+{IND3}break;
+#endif
+""")
+        return ''.join(output)
 
     def callbacks(self):
         """
@@ -206,20 +226,20 @@ class CPP():
         defines : str
         """
 
-        TAB = 4
-        output = ''
+        output = []
         for command in self._commands:
+            alias = command.alias
             if command.has_request:
-                output += f'#if defined(USE_{command.alias}_REQUEST_CALLBACK) && defined(SYNDESI_DEVICE_MODE)\n'
-                output += TAB*' ' + \
-                    f'void (*{command.alias}_request_callback)({command.alias}_request&, {command.alias}_reply*);\n'
-                output += f'#endif\n'
+                output.append(f"""#if defined(USE_{alias}_REQUEST_CALLBACK) && defined(SYNDESI_DEVICE_MODE)
+{IND1}void (*{alias}_request_callback)({alias}_request&, {alias}_reply*);
+#endif
+""")
             if command.has_reply:
-                output += f'#if defined(USE_{command.alias}_REPLY_CALLBACK) && defined(SYNDESI_HOST_MODE)\n'
-                output += TAB*' ' + \
-                    f'void (*{command.alias}_reply_callback)({command.alias}_reply&);\n'
-                output += f'#endif\n'
-        return output
+                output.append(f"""#if defined(USE_{alias}_REPLY_CALLBACK) && defined(SYNDESI_HOST_MODE)
+{IND1}void (*{alias}_reply_callback)({alias}_reply&);
+#endif
+""")
+        return ''.join(output)
 
     def commands_names_switch(self):
         """
@@ -232,14 +252,12 @@ class CPP():
         -------
         names : str
         """
-        names = ""
+        names = []
 
-        for i, command in enumerate(self._commands):
-            names += 2*TAB + f"case 0x{command.ID:04X}:\n"
-            names += 3*TAB + f"return \"{command.alias}\";\n"
-            names += 3*TAB + "break;\n"
+        for command in self._commands:
+            names.append(f"{IND2}case {command.id_hex4}:\n{IND3}return \"{command.alias}\";\n{IND3}break;\n")
 
-        return names
+        return ''.join(names)
 
     def new_payload(self, request):
         """
@@ -254,16 +272,14 @@ class CPP():
         names : str
         """
 
-        names = ""
+        names = []
+        suffix = 'request' if request else 'reply'
 
-        for i, command in enumerate(self._commands):
+        for command in self._commands:
             if (command.has_request and request) or (command.has_reply and not request):
-                names += 2*TAB + f"case 0x{command.ID:04X}:\n"
-                names += 3*TAB + \
-                    f"return new {command.alias}_{'request' if request else 'reply'}();\n"
-                names += 3*TAB + "break;\n"
+                names.append(f"{IND2}case {command.id_hex4}:\n{IND3}return new {command.alias}_{suffix}();\n{IND3}break;\n")
 
-        return names
+        return ''.join(names)
 
     def commands_ids(self):
         """
@@ -277,11 +293,6 @@ class CPP():
         -------
         output : str
         """
-        output = ""
-        for i, command in enumerate(self._commands):
-            if i > 0:
-                output += ',\n'
-            output += f"0x{command.ID:04X}"
-        return output
+        return ',\n'.join(command.id_hex4 for command in self._commands)
 
 
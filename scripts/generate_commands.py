@@ -12,7 +12,7 @@ A template (.txt) is used for each file and keys (>>>...<<<) are replaced by the
 
 import yaml
 from datetime import datetime
-from os.path import join, dirname, exists
+from os.path import join, exists
 from pathlib import Path    
 from utilities import replace, replace_str
 from commands import Command
@@ -21,11 +21,15 @@ from cpp import CPP
 from md import MD
 from python import Python
 from sys import argv
+from concurrent.futures import ThreadPoolExecutor
+
+# Directory of this script, resolved once
+SCRIPT_DIR = Path(__file__).resolve().parent
 
 # Other repositories
 repos_path = {
-    "Documentation" : join(dirname(__file__), "../../Documentation"),
-    "SyndesiPy" : join(dirname(__file__), "../../SyndesiPy")
+    "Documentation" : str(SCRIPT_DIR.parent.parent / "Documentation"),
+    "SyndesiPy" : str(SCRIPT_DIR.parent.parent / "SyndesiPy")
 }
 
 for p in repos_path.values():
@@ -33,95 +37,102 @@ for p in repos_path.values():
     assert exists(join(p, ".git")), f"Repository {p} doesn't exist"
 
 # Files
-COMMANDS_DESCRIPTION_FILE = join(dirname(__file__), "commands.yaml")
+COMMANDS_DESCRIPTION_FILE = str(SCRIPT_DIR / "commands.yaml")
 
 # Each of the following file is a tuple (template, output)
 # C++
-PAYLOADS_H = (join(dirname(__file__), "payloads_template.h.txt"),join(dirname(__file__), "../include/payloads.h"))
-CONFIG_H = (join(dirname(__file__), "syndesi_config_template.h.txt"), join(dirname(__file__), "../user_config/syndesi_config.h"))
-CALLBACKS_H = (join(dirname(__file__), "callbacks_template.h.txt"), join(dirname(__file__), "../include/callbacks.h"))
-FRAME_MANAGER_H = (join(dirname(__file__), "framemanager_template.h.txt"), join(dirname(__file__), "../include/framemanager.h"))
-PAYLOADS_CPP = (join(dirname(__file__), "payloads_template.cpp.txt"),join(dirname(__file__), "../include/payloads.cpp"))
+PAYLOADS_H = (str(SCRIPT_DIR / "payloads_template.h.txt"), str(SCRIPT_DIR.parent / "include/payloads.h"))
+CONFIG_H = (str(SCRIPT_DIR / "syndesi_config_template.h.txt"), str(SCRIPT_DIR.parent / "user_config/syndesi_config.h"))
+CALLBACKS_H = (str(SCRIPT_DIR / "callbacks_template.h.txt"), str(SCRIPT_DIR.parent / "include/callbacks.h"))
+FRAME_MANAGER_H = (str(SCRIPT_DIR / "framemanager_template.h.txt"), str(SCRIPT_DIR.parent / "include/framemanager.h"))
+PAYLOADS_CPP = (str(SCRIPT_DIR / "payloads_template.cpp.txt"), str(SCRIPT_DIR.parent / "include/payloads.cpp"))
 # Templates
-PAYLOAD_TEMPLATE_H = join(dirname(__file__), "payload_class_template.h.txt")
+PAYLOAD_TEMPLATE_H = str(SCRIPT_DIR / "payload_class_template.h.txt")
 
 # Python
-PAYLOADS_PY = (join(dirname(__file__), "payloads_template.py.txt"), join(repos_path["SyndesiPy"], "syndesi/payloads.py"))
+PAYLOADS_PY = (str(SCRIPT_DIR / "payloads_template.py.txt"), join(repos_path["SyndesiPy"], "syndesi/payloads.py"))
 # Templates
-PAYLOAD_TEMPLATE_PY = join(dirname(__file__), "payload_class_template.py.txt")
+PAYLOAD_TEMPLATE_PY = str(SCRIPT_DIR / "payload_class_template.py.txt")
 
 # Markdown
-COMMANDS_LIST_MD = (join(dirname(__file__), "commands_list_template.md"), join(repos_path["Documentation"], "communication/commands_list.md"))
+COMMANDS_LIST_MD = (str(SCRIPT_DIR / "commands_list_template.md"), join(repos_path["Documentation"], "communication/commands_list.md"))
 
 def main():
     # Read the description file
     with open(COMMANDS_DESCRIPTION_FILE, 'r', encoding='utf-8') as desc:
         desc_content = yaml.full_load(desc)
-        # Load commands
-        commands = [Command(cmd) for cmd in desc_content[YAML_COMMANDS_LIST_KEY]]
-        # Load special values
+    # Load commands
+    commands = [Command(cmd) for cmd in desc_content[YAML_COMMANDS_LIST_KEY]]
+
+    # Load special values
+    settings = desc_content[YAML_SETTINGS_KEY]
 
-        settings = desc_content[YAML_SETTINGS_KEY]
+    cpp = CPP(commands)
+    python = Python(commands)
+    md = MD(commands)
 
-        cpp = CPP(commands)
-        python = Python(commands)
-        md = MD(commands)
+    date = datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S")
+    file = Path(__file__).name
 
+    # Each output file is a (template, output, keys) job. The contents are
+    # generated beforehand so that the jobs only read, replace and write
+    jobs = [
         # Create C++ header
-        replace(*PAYLOADS_H, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*PAYLOADS_H, {
+            "date" : date,
+            "file" : file,
             "commands" : cpp.commands_enum(),
             "payloads" : cpp.payloads(PAYLOAD_TEMPLATE_H),
-        })
+        }),
         # Create C++ source
-        replace(*PAYLOADS_CPP, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*PAYLOADS_CPP, {
+            "date" : date,
+            "file" : file,
             "commands_names_switch" : cpp.commands_names_switch(),
             "commands_ids" : cpp.commands_ids(),
             "new_payload_request" : cpp.new_payload(True),
             "new_payload_reply" : cpp.new_payload(False)
-        })
-
+        }),
         # Create C++ callbacks configuration file (for the user to edit)
-        replace(*CONFIG_H, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*CONFIG_H, {
+            "date" : date,
+            "file" : file,
             "request" : cpp.defines(request=True),
             "reply" : cpp.defines(request=False)
-        })
-
-        
-
+        }),
         # Create C++ callbacks source file
-        replace(*FRAME_MANAGER_H, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*FRAME_MANAGER_H, {
+            "date" : date,
+            "file" : file,
             "switch_request" : cpp.switch(request=True),
             "switch_reply" : cpp.switch(request=False)
-        })
-
+        }),
         # Create C++ callbacks header file
-        replace(*CALLBACKS_H, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*CALLBACKS_H, {
+            "date" : date,
+            "file" : file,
             "callbacks" : cpp.callbacks()
-        })
-
+        }),
         # Markdown commands list
-        replace(*COMMANDS_LIST_MD, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*COMMANDS_LIST_MD, {
+            "date" : date,
+            "file" : file,
             "list" : md.commands_list()
-        })
-
+        }),
         # python payload list
-        replace(*PAYLOADS_PY, {
-            "date" : datetime.strftime(datetime.now(), "%y-%m-%d %H:%M:%S"),
-            "file" : Path(__file__).name,
+        (*PAYLOADS_PY, {
+            "date" : date,
+            "file" : file,
             "payloads" : python.payloads(PAYLOAD_TEMPLATE_PY)
         })
+    ]
+
+    # The output files are independent, write them concurrently
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        # Status messages are printed here, in job order, so that the
+        # workers' outputs don't interleave (this also propagates exceptions)
+        for status in executor.map(lambda job : replace(*job), jobs):
+            print(status)
 
 if __name__ == '__main__':
     main()
@@ -1,4 +1,4 @@
-from enum import Enum, auto
+from enum import IntEnum, auto
 
 # Number of bytes per command
 COMMAND_BYTES = 2
@@ -17,7 +17,7 @@ YAML_TYPE_KEY = "type"
 
 
 
-class types(Enum):
+class types(IntEnum):
     short = auto()
     ushort = auto()
     int = auto()
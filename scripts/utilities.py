@@ -1,9 +1,109 @@
 """
 Utilities file
 """
+import os
 from os.path import basename, getmtime, join, dirname, exists
+from functools import lru_cache
+import re
 
+# Template key, written as >>>key<<<
+_KEY_RE = re.compile(r">>>(\w+)<<<")
+# Marks a key that isn't in the replace dictionary (None is a valid value)
+_MISSING = object()
+# Volatile value marker, written as \0key\0 in the text being compared
+_VOLATILE_RE = re.compile(r"\0(\w+)\0")
 
+@lru_cache(maxsize=None)
+def load_template(template_file : str):
+    """
+    Read a template file and return its content
+
+    The content is cached so that each template is only read once per run
+
+    Parameters
+    ----------
+    template_file : str
+        Path to template file
+    """
+    with open(template_file, 'r', encoding='utf-8') as template_file_handler:
+        return template_file_handler.read()
+
+
+@lru_cache(maxsize=None)
+def compile_template(text_in : str):
+    """
+    Split a template text into literal chunks and keys
+
+    The result is cached so that a template used for multiple outputs
+    (one per payload for example) is only scanned once
+
+    Parameters
+    ----------
+    text_in : str
+        Template text
+
+    Returns
+    -------
+    parts : tuple
+        Literal chunks at even indices, keys at odd indices
+    keys : frozenset
+        Keys present in the template
+    """
+    parts = tuple(_KEY_RE.split(text_in))
+    return parts, frozenset(parts[1::2])
+
+def check_keys(text_in : str, replace : dict):
+    """
+    Raise a ValueError if keys of replace aren't in the text
+
+    Parameters
+    ----------
+    text_in : str
+        Template text
+    replace : dict
+        Dictionary of keys and data to replace
+    """
+    _, present = compile_template(text_in)
+    # Keys are collected once when the template is compiled, a single set
+    # difference reports every missing key
+    missing = replace.keys() - present
+    if missing:
+        raise ValueError(f"Missing key(s) {', '.join(sorted(missing))} from text")
+
+def _rendered_parts(text_in : str, replace : dict):
+    """
+    Yield the chunks of the text with its keys replaced, without checking
+    the keys (see check_keys)
+    """
+    parts, _ = compile_template(text_in)
+    get = replace.get
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            yield part
+        else:
+            value = get(part, _MISSING)
+            # Keys that aren't in the dictionary are left as-is
+            yield f">>>{part}<<<" if value is _MISSING else value
+
+def replace_into(text_in : str, replace : dict, out):
+    """
+    Replace each occurence of a key in a text and write the result to out
+
+    Nothing is written if a key is missing from the text
+
+    Parameters
+    ----------
+    text_in : str
+        Template text
+    replace : dict
+        Dictionary of keys and data to replace
+    out : file-like
+        Object with a write method (opened file, StringIO, ...)
+    """
+    check_keys(text_in, replace)
+    write = out.write
+    for chunk in _rendered_parts(text_in, replace):
+        write(chunk)
 
 def replace_str(text_in : str, replace : dict):
     """
@@ -12,23 +112,102 @@ def replace_str(text_in : str, replace : dict):
     Parameters
     ----------
     text_in : str
-        Path to template file
+        Template text
     replace : dict
         Dictionary of keys and data to replace
-    force : bool
-        Force replace the file (even if there aren't any modifications to it)
     """
-    output = text_in
-    for key, rep in replace.items():
-        if not f">>>{key}<<<" in output:
-            raise ValueError(f"Missing key '{key}' from text")
-        output = output.replace(f">>>{key}<<<", rep)
-    return output
+    check_keys(text_in, replace)
+    return ''.join(_rendered_parts(text_in, replace))
+
+class _LineComparator():
+    def __init__(self, file_handler):
+        """
+        File-like object comparing the text written to it with an opened file,
+        line by line
+
+        Volatile values (like the generation date) are marked as \\0key\\0 in
+        the written text and can have any value on their line in the file
+        """
+        self._file = file_handler
+        # Pieces of the current (incomplete) line
+        self._line = []
+        self.equal = True
+
+    def write(self, text):
+        if not self.equal:
+            return
+        start = 0
+        end = text.find('\n')
+        while end != -1:
+            self._line.append(text[start:end + 1])
+            self._compare(''.join(self._line))
+            self._line = []
+            start = end + 1
+            end = text.find('\n', start)
+        if start < len(text):
+            self._line.append(text[start:])
+
+    def close(self):
+        """
+        Compare the last line and check that the file doesn't contain more
+        """
+        if self._line:
+            self._compare(''.join(self._line))
+            self._line = []
+        if self.equal and self._file.read(1):
+            self.equal = False
+
+    def _compare(self, masked_line):
+        current_line = self._file.readline()
+        if current_line == masked_line:
+            return
+        if '\0' not in masked_line:
+            self.equal = False
+            return
+        # Only the few lines holding a volatile value are matched with a pattern
+        fragments = _VOLATILE_RE.split(masked_line)
+        if any(f">>>{key}<<<" in current_line for key in fragments[1::2]):
+            # The file still contains an unreplaced volatile key
+            self.equal = False
+        elif re.fullmatch('.*'.join(map(re.escape, fragments[::2])), current_line) is None:
+            self.equal = False
 
-def replace(template_file : str, output_file : str, replace : dict):
+def unchanged(output_file : str, template : str, masked_replace : dict):
+    """
+    Check if output_file already contains the template filled with masked_replace
+
+    The text is compared while it is rendered, it is never built in memory.
+    The keys must have been checked beforehand (see check_keys)
+
+    Parameters
+    ----------
+    output_file : str
+        Path to output file
+    template : str
+        Template text
+    masked_replace : dict
+        Dictionary of keys and data to replace, with volatile values marked
+
+    Returns
+    -------
+    unchanged : bool
+    """
+    if not exists(output_file):
+        return False
+    with open(output_file, 'r', encoding='utf-8') as output_file_handler:
+        comparator = _LineComparator(output_file_handler)
+        for chunk in _rendered_parts(template, masked_replace):
+            comparator.write(chunk)
+        comparator.close()
+    return comparator.equal
+
+def replace(template_file : str, output_file : str, replace : dict, volatile_keys : tuple = ("date",)):
     """
     Replace each occurence of a key in template file with replace_width element
     and save to output_file
+
+    The output file isn't written if its content wouldn't change (apart from
+    volatile keys), this keeps its timestamp and avoids needless rebuilds
     
     Parameters
     ----------
@@ -38,14 +217,43 @@ def replace(template_file : str, output_file : str, replace : dict):
         Path to output file
     replace : dict
         Dictionary of keys and data to replace
+    volatile_keys : tuple
+        Keys that are ignored when checking if the output file changed
+
+    Returns
+    -------
+    status : str
+        Message describing what was done with the output file
     """
     with open(template_file, 'r', encoding='utf-8') as template_file_handler:
         template = template_file_handler.read()
+        # Keys are checked once here, the comparison and the write below
+        # render the template without checking them again
         try:
-            output = replace_str(template, replace)
+            check_keys(template, replace)
         except ValueError as e:
             raise ValueError(f"{e} ({template_file}")
-            
-        with open(output_file, 'w', encoding='utf-8') as output_file_handler:
-            print(f"Write file {basename(output_file)}")
-            output_file_handler.write(output)
\ No newline at end of file
+
+        # Volatile values are marked so that the comparison ignores them. Only
+        # single line values can be masked, others (or a missing value) are
+        # compared as-is
+        masked_replace = {**replace, **{key: f"\0{key}\0" for key in volatile_keys
+            if isinstance(replace.get(key), str) and '\n' not in replace[key]}}
+        if unchanged(output_file, template, masked_replace):
+            return f"No content change for {basename(output_file)}"
+
+        # Written to a temporary file first and renamed, so that an interrupted
+        # run never leaves a truncated output behind
+        temporary_file = output_file + '.tmp'
+        try:
+            with open(temporary_file, 'w', encoding='utf-8') as output_file_handler:
+                # Written chunk by chunk, the rendered text is never joined in memory
+                for chunk in _rendered_parts(template, replace):
+                    output_file_handler.write(chunk)
+            os.replace(temporary_file, output_file)
+        except BaseException:
+            # Don't leave the temporary file next to the outputs
+            if exists(temporary_file):
+                os.unlink(temporary_file)
+            raise
+        return f"Write file {basename(output_file)}"